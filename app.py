@@ -1,12 +1,24 @@
 ﻿import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pv
 import streamlit as st
 import warnings
 import os
 import gc
+import hashlib
+import tempfile
 from datetime import datetime, timedelta, date
 import io
 
+# Polars 为可选依赖，未安装时使用默认的 PyArrow 读取路径
+try:
+    import polars as pl
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
+
 # 设置页面配置
 st.set_page_config(
     page_title="电商用户行为分析仪表",
@@ -64,95 +76,263 @@ sample_ratio = st.sidebar.slider(
     help="为了处理速度，建议使用较小的抽样比例"
 )
 
-# 数据加载函数（保持不变）
-@st.cache_data
-def load_and_preprocess_data(_uploaded_file, sample_fraction=0.02):
-    """处理上传的数据文件"""
+# 读取引擎开关（仅在安装 Polars 时显示），默认使用 PyArrow
+use_polars = POLARS_AVAILABLE and st.sidebar.checkbox(
+    "使用 Polars 读取 / Read with Polars",
+    value=False,
+    help="使用 Polars 多线程读取 CSV 并抽样"
+)
+
+# CSV 列名与读取类型 / CSV column names and parse types
+COLUMN_NAMES = ["user_id", "item_id", "category_id", "behavior_type", "timestamp"]
+COLUMN_TYPES = {
+    "user_id": pa.int32(),
+    "item_id": pa.int32(),
+    "category_id": pa.int32(),
+    "behavior_type": pa.dictionary(pa.int32(), pa.string()),  # pyarrow CSV 仅支持 int32 索引
+    "timestamp": pa.int32()  # 秒级时间戳，2038 年前均在 int32 范围内
+}
+
+# 按位置读取前 5 列（f0-f4），上游文件多出的列不会被解析
+PROJECTED_COLUMNS = [f"f{i}" for i in range(len(COLUMN_NAMES))]
+
+# 预处理结果结构变化时递增，避免读取旧格式的 parquet 缓存
+CACHE_VERSION = 3
+
+def days_to_date(days):
+    """将自 1970-01-01 起的天数转换为日期，用于展示"""
+    return date(1970, 1, 1) + timedelta(days=int(days))
+
+@st.cache_data(show_spinner=False)
+def get_file_digest(_uploaded_file, file_id):
+    """计算上传文件的内容哈希；按 file_id 缓存，每次上传只计算一次"""
+    return hashlib.blake2b(_uploaded_file.getbuffer()).hexdigest()[:16]
+
+def get_cache_path(uploaded_file, sample_fraction, use_polars=False):
+    """按文件内容哈希、抽样比例与读取引擎生成 parquet 缓存路径"""
+    engine = "pl" if use_polars else "pa"
+    digest = get_file_digest(uploaded_file, uploaded_file.file_id)
+    key = f"{digest}_{sample_fraction}_{engine}_v{CACHE_VERSION}"
+    return os.path.join(tempfile.gettempdir(), f"ub_{key}.parquet")
+
+def read_with_pyarrow(uploaded_file, sample_fraction):
+    """PyArrow 多线程解析 CSV（列投影），在转换为 pandas 之前对 Arrow 表做伯努利抽样"""
+    tbl = pv.read_csv(
+        uploaded_file,
+        read_options=pv.ReadOptions(autogenerate_column_names=True, block_size=8 << 20),
+        convert_options=pv.ConvertOptions(
+            include_columns=PROJECTED_COLUMNS,
+            column_types=dict(zip(PROJECTED_COLUMNS, (COLUMN_TYPES[name] for name in COLUMN_NAMES)))
+        )
+    ).rename_columns(COLUMN_NAMES)
+    if sample_fraction < 1.0:
+        mask = pa.array(np.random.default_rng(42).random(tbl.num_rows) < sample_fraction)
+        tbl = tbl.filter(mask)
+    return tbl.to_pandas()
+
+def read_with_polars(uploaded_file, sample_fraction):
+    """Polars 多线程解析 CSV 并抽样，列类型与 PyArrow 路径一致"""
+    # 与 PyArrow 路径一致，仅按位置读取前 5 列；自动生成的列名随版本不同，按位置重命名
+    pl_df = pl.read_csv(
+        uploaded_file,
+        has_header=False,
+        columns=list(range(len(COLUMN_NAMES)))
+    )
+    pl_df = pl_df.rename(dict(zip(pl_df.columns, COLUMN_NAMES)))
+    # 读取后再转换类型：schema_overrides 仅在较新的 Polars 中可用
+    pl_df = pl_df.with_columns([
+        pl.col("user_id").cast(pl.Int32),
+        pl.col("item_id").cast(pl.Int32),
+        pl.col("category_id").cast(pl.Int32),
+        pl.col("behavior_type").cast(pl.Categorical),
+        pl.col("timestamp").cast(pl.Int32)
+    ])
+    if sample_fraction < 1.0:
+        pl_df = pl_df.sample(fraction=sample_fraction, seed=42)
+    return pl_df.to_pandas()
+
+# 数据加载函数
+@st.cache_data(persist="disk", show_spinner=False)
+def load_and_preprocess_data(_uploaded_file, sample_fraction=0.02, cache_path=None, use_polars=False):
+    """处理上传的数据文件，预处理结果缓存为 parquet"""
     
     if _uploaded_file is None:
         return pd.DataFrame()
     
-    try:
-        progress_text = st.empty()
-        progress_bar = st.progress(0)
-        
-        progress_text.text("正在加载数据... / Loading data...")
-        progress_bar.progress(20)
-        
-        # 读取上传的文件
-        df = pd.read_csv(
-            _uploaded_file,
-            names=["user_id", "item_id", "category_id", "behavior_type", "timestamp"],
-            header=None,
-            low_memory=False
-        )
-        
-        progress_bar.progress(40)
-        progress_text.text("数据预处理中... / Data preprocessing...")
-        
-        # 抽样
-        if sample_fraction < 1.0:
-            df = df.sample(frac=sample_fraction, random_state=42)
-        
-        st.success(f"成功读取 {len(df):,} 行数据 / Successfully read {len(df):,} rows of data")
-        
-        # 检查行为类型的唯一性
-        st.write(f"行为类型唯一性 / Unique behavior types: {df['behavior_type'].unique()}")
-        
-        # 时间戳转换
-        df["datetime"] = pd.to_datetime(df["timestamp"], unit="s", errors="coerce")
-        invalid_time_count = df["datetime"].isna().sum()
-        if invalid_time_count > 0:
-            st.warning(f"过滤无效时间戳 {invalid_time_count} 条 / Filtered invalid timestamps: {invalid_time_count} records")
-            df = df.dropna(subset=["datetime"])
-        
-        if len(df) == 0:
-            st.error("⚠️ 无有效时间数据 / No valid time data")
-            return pd.DataFrame()
-        
-        # 衍生时间特征
-        df["date"] = df["datetime"].dt.date
-        df["hour"] = df["datetime"].dt.hour
-        df["weekday"] = df["datetime"].dt.weekday + 1
-        
-        # 英文行为类型映射到中文
-        behavior_map = {
-            'pv': '浏览 / View',
-            'fav': '收藏 / Favorite', 
-            'cart': '加购 / Add to Cart',
-            'buy': '购买 / Purchase'
-        }
-        
-        df["behavior_name"] = df["behavior_type"].map(behavior_map)
-        
-        # 过滤无效行为类型
-        invalid_behavior_count = df["behavior_name"].isna().sum()
-        if invalid_behavior_count > 0:
-            st.warning(f"过滤无效行为类型: {invalid_behavior_count} 条 / Filtered invalid behavior types: {invalid_behavior_count} records")
-            df = df.dropna(subset=["behavior_name"])
-        
-        # 去重
-        initial_count = len(df)
-        df = df.drop_duplicates(subset=["user_id", "item_id", "behavior_type", "timestamp"])
-        duplicate_count = initial_count - len(df)
-        if duplicate_count > 0:
-            st.info(f"去除重复记录: {duplicate_count} 条 / Removed duplicate records: {duplicate_count} records")
-        
-        progress_bar.progress(100)
-        progress_text.text("数据预处理完成！ / Data preprocessing completed!")
-        
-        st.success(f"数据预处理完成：{len(df):,} 条有效记录 / Data preprocessing completed: {len(df):,} valid records")
-        
-        return df
-        
-    except Exception as e:
-        st.error(f"数据加载失败：{str(e)} / Data loading failed: {str(e)}")
+    # 命中 parquet 缓存时直接读取，跳过 CSV 解析；缓存损坏时删除并重新解析
+    if cache_path and os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path)
+        except (OSError, pa.ArrowException):
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+    
+    # 异常直接抛出由调用方处理，避免失败结果被 st.cache_data 缓存到磁盘
+    progress_text = st.empty()
+    progress_bar = st.progress(0)
+    
+    progress_text.text("正在加载数据... / Loading data...")
+    progress_bar.progress(20)
+    
+    # 读取上传的文件并抽样（指定列类型）
+    _uploaded_file.seek(0)
+    if use_polars and POLARS_AVAILABLE:
+        df = read_with_polars(_uploaded_file, sample_fraction)
+    else:
+        df = read_with_pyarrow(_uploaded_file, sample_fraction)
+    
+    progress_bar.progress(40)
+    progress_text.text("数据预处理中... / Data preprocessing...")
+    
+    st.success(f"成功读取 {len(df):,} 行数据 / Successfully read {len(df):,} rows of data")
+    
+    # 检查行为类型的唯一性
+    st.write(f"行为类型唯一性 / Unique behavior types: {df['behavior_type'].unique()}")
+    
+    # 英文行为类型映射到中文
+    behavior_map = {
+        'pv': '浏览 / View',
+        'fav': '收藏 / Favorite', 
+        'cart': '加购 / Add to Cart',
+        'buy': '购买 / Purchase'
+    }
+    
+    # 时间戳转换
+    df["datetime"] = pd.to_datetime(df["timestamp"], unit="s", errors="coerce")
+    
+    # 无效时间戳与无效行为类型合并为一次布尔过滤
+    valid_time = df["datetime"].notna().to_numpy()
+    valid_behavior = df["behavior_type"].isin(list(behavior_map)).to_numpy()
+    
+    invalid_time_count = int((~valid_time).sum())
+    if invalid_time_count > 0:
+        st.warning(f"过滤无效时间戳 {invalid_time_count} 条 / Filtered invalid timestamps: {invalid_time_count} records")
+    
+    if not valid_time.any():
+        st.error("⚠️ 无有效时间数据 / No valid time data")
         return pd.DataFrame()
+    
+    invalid_behavior_count = int((valid_time & ~valid_behavior).sum())
+    if invalid_behavior_count > 0:
+        st.warning(f"过滤无效行为类型: {invalid_behavior_count} 条 / Filtered invalid behavior types: {invalid_behavior_count} records")
+    
+    mask = valid_time & valid_behavior
+    if not mask.all():
+        df = df.loc[mask]
+    
+    # 衍生时间特征：直接在秒级整数时间戳上做向量化运算
+    # date 为自 1970-01-01 起的天数（int32），仅在展示时转换为日期
+    secs = df["timestamp"].to_numpy(dtype="int64")
+    days = secs // 86400
+    df["date"] = days.astype("int32")
+    df["hour"] = ((secs // 3600) % 24).astype("int8")
+    df["weekday"] = ((days + 3) % 7 + 1).astype("int8")  # 1970-01-01 为周四
+    
+    # 分类类型上重命名类别，未知行为类型已在上方过滤
+    df["behavior_type"] = df["behavior_type"].astype("category")
+    df["behavior_name"] = (
+        df["behavior_type"]
+        .cat.set_categories(list(behavior_map))
+        .cat.rename_categories(behavior_map)
+    )
+    
+    # 去重
+    initial_count = len(df)
+    df = df.drop_duplicates(subset=["user_id", "item_id", "behavior_type", "timestamp"], ignore_index=True)
+    duplicate_count = initial_count - len(df)
+    if duplicate_count > 0:
+        st.info(f"去除重复记录: {duplicate_count} 条 / Removed duplicate records: {duplicate_count} records")
+    
+    progress_bar.progress(100)
+    progress_text.text("数据预处理完成！ / Data preprocessing completed!")
+    
+    st.success(f"数据预处理完成：{len(df):,} 条有效记录 / Data preprocessing completed: {len(df):,} valid records")
+    
+    # 写入 parquet 缓存：先写同目录临时文件再原子替换，写入失败不影响本次分析
+    if cache_path:
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(suffix=".parquet.tmp", dir=os.path.dirname(cache_path))
+            os.close(fd)
+            df.to_parquet(tmp_path, compression="zstd", index=False)
+            os.replace(tmp_path, cache_path)
+        except (OSError, pa.ArrowException):
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    return df
+
+def arrow_value_counts(series):
+    """使用 PyArrow 哈希聚合内核计数，返回以取值为索引的计数 Series（未排序，忽略缺失值）"""
+    # from_pandas 将 NaN 视为空值，drop_null 后与 groupby/nunique 一致不计入缺失 ID
+    result = pc.value_counts(pc.drop_null(pa.Array.from_pandas(series)))
+    return pd.Series(
+        result.field("counts").to_numpy(),
+        index=pd.Index(result.field("values").to_numpy(), name=series.name)
+    )
+
+def top_counts(counts, k=5):
+    """按次数降序、ID 升序取前 k 项，保证并列时结果与数据行序无关"""
+    order = np.lexsort((counts.index.to_numpy(), -counts.to_numpy()))
+    return counts.iloc[order[:k]]
+
+def count_behaviors(df):
+    """汇总各维度的行为计数：小时/星期用稠密 bincount，ID 列用 Arrow 哈希计数（每个计数器各扫描一次对应列）"""
+    hour_counts = np.bincount(df["hour"].to_numpy(), minlength=24)
+    weekday_counts = np.bincount(df["weekday"].to_numpy(), minlength=8)[1:]
+    hourly = pd.Series(hour_counts, index=pd.RangeIndex(24, name="hour"))
+    weekday = pd.Series(weekday_counts, index=pd.RangeIndex(1, 8, name="weekday"))
+    
+    return {
+        "hourly": hourly[hourly > 0],
+        "weekday": weekday[weekday > 0],
+        "user": arrow_value_counts(df["user_id"]),
+        "top_items": top_counts(arrow_value_counts(df["item_id"])),
+        "top_categories": top_counts(arrow_value_counts(df["category_id"]))
+    }
 
-# 主应用逻辑（保持不变）
+@st.cache_data(show_spinner=False)
+def compute_aggregates(_df, cache_path, start_date, end_date, selected_behaviors):
+    """计算过滤后数据的全部统计结果；缓存键为 parquet 缓存路径与过滤条件，不哈希 DataFrame"""
+    # 数据过滤：date 为 int32 天数，直接与同类型标量做向量化比较
+    dates = _df["date"].to_numpy()
+    start_day, end_day = np.int32(start_date), np.int32(end_date)
+    mask = (dates >= start_day) & (dates <= end_day) & _df["behavior_name"].isin(selected_behaviors).to_numpy()
+    df_filtered = _df[mask]
+    
+    behavior_counts = count_behaviors(df_filtered)
+    
+    # 分层区间为 (0,5]、(5,20]、(20,100]、(100,+inf)，side="left" 使边界值落入左侧区间
+    counts = behavior_counts["user"].to_numpy()
+    segment_idx = np.searchsorted(np.array([5, 20, 100], dtype=counts.dtype), counts, side="left")
+    segment_labels = ["低活跃(1-5次)", "中活跃(6-20次)", "高活跃(21-100次)", "超高活跃(100+次)"]
+    segment_dist = pd.Series(
+        np.bincount(segment_idx, minlength=len(segment_labels)),
+        index=segment_labels
+    ).sort_values(ascending=False, kind="stable")
+    
+    return {
+        "total_behaviors": len(df_filtered),
+        # 用户数直接取自用户计数结果；商品数对 int32 数组做排序去重
+        "total_users": len(behavior_counts["user"]),
+        "total_items": np.unique(df_filtered["item_id"].dropna().to_numpy()).size,
+        "behavior_dist": df_filtered["behavior_name"].value_counts(),
+        "behavior_counts": behavior_counts,
+        "segment_dist": segment_dist,
+        "preview": df_filtered.head(100)
+    }
+
+# 主应用逻辑
 if uploaded_file is not None:
     # 加载数据
-    df = load_and_preprocess_data(uploaded_file, sample_ratio)
+    cache_path = get_cache_path(uploaded_file, sample_ratio, use_polars)
+    try:
+        df = load_and_preprocess_data(uploaded_file, sample_ratio, cache_path, use_polars)
+    except Exception as e:
+        st.error(f"数据加载失败：{str(e)} / Data loading failed: {str(e)}")
+        df = pd.DataFrame()
     
     if not df.empty:
         # 固定日期范围
@@ -162,15 +342,14 @@ if uploaded_file is not None:
         # 固定行为类型
         selected_behaviors = ["浏览 / View", "收藏 / Favorite", "加购 / Add to Cart", "购买 / Purchase"]
         
-        # 数据过滤
-        df_filtered = df[
-            (df["date"] >= start_date) & 
-            (df["date"] <= end_date) & 
-            (df["behavior_name"].isin(selected_behaviors))
-        ].copy()
+        # 统计结果按过滤条件缓存，页面重绘时无需重新计算
+        aggregates = compute_aggregates(df, cache_path, int(start_date), int(end_date), selected_behaviors)
+        total_behaviors = aggregates["total_behaviors"]
+        behavior_counts = aggregates["behavior_counts"]
         
-        st.info(f"📈 分析日期范围: {start_date} - {end_date} / Analysis date range: {start_date} - {end_date}")
-        st.info(f"📊 过滤后数据量: {len(df_filtered):,} 条记录 / Filtered data volume: {len(df_filtered):,} records")
+        start_label, end_label = days_to_date(start_date), days_to_date(end_date)
+        st.info(f"📈 分析日期范围: {start_label} - {end_label} / Analysis date range: {start_label} - {end_label}")
+        st.info(f"📊 过滤后数据量: {total_behaviors:,} 条记录 / Filtered data volume: {total_behaviors:,} records")
         
         # 数据分析
         st.header("📊 数据分析结果 / Data Analysis Results")
@@ -179,19 +358,16 @@ if uploaded_file is not None:
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            total_users = df_filtered["user_id"].nunique()
-            st.metric("总用户数 / Total Users", f"{total_users:,}")
+            st.metric("总用户数 / Total Users", f"{aggregates['total_users']:,}")
         
         with col2:
-            total_items = df_filtered["item_id"].nunique()
-            st.metric("总商品数 / Total Items", f"{total_items:,}")
+            st.metric("总商品数 / Total Items", f"{aggregates['total_items']:,}")
         
         with col3:
-            total_behaviors = len(df_filtered)
             st.metric("总行为数 / Total Behaviors", f"{total_behaviors:,}")
         
         # 行为分布
-        behavior_dist = df_filtered["behavior_name"].value_counts()
+        behavior_dist = aggregates["behavior_dist"]
         
         st.subheader("📊 行为类型分布 / Behavior Type Distribution")
         behavior_cols = st.columns(4)
@@ -202,7 +378,8 @@ if uploaded_file is not None:
                 st.metric(behavior, f"{count:,}", f"{percentage:.1f}%")
         
         # 转化率计算
-        if "浏览 / View" in behavior_dist and "购买 / Purchase" in behavior_dist:
+        # 分类类型的 value_counts 会保留计数为 0 的类别，因此按计数判断
+        if behavior_dist.get("浏览 / View", 0) > 0 and behavior_dist.get("购买 / Purchase", 0) > 0:
             purchase_rate = (behavior_dist["购买 / Purchase"] / behavior_dist["浏览 / View"]) * 100
             st.success(f"📈 浏览→购买转化率: {purchase_rate:.2f}% / View→Purchase conversion rate: {purchase_rate:.2f}%")
         else:
@@ -216,67 +393,68 @@ if uploaded_file is not None:
         
         with col1:
             # 小时分布
-            hourly_behavior = df_filtered.groupby("hour").size().reset_index(name="behavior_count")
-            peak_hour = hourly_behavior.loc[hourly_behavior['behavior_count'].idxmax(), 'hour']
+            hourly_behavior = behavior_counts["hourly"].rename("behavior_count")
+            peak_hour = int(hourly_behavior.idxmax())
             
             st.subheader("用户活跃小时分布 / User Activity Hourly Distribution")
-            st.bar_chart(hourly_behavior.set_index("hour"))
+            st.bar_chart(hourly_behavior)
             st.info(f"活跃高峰时段: {peak_hour}:00 / Peak activity hour: {peak_hour}:00")
         
         with col2:
             # 周内分布
-            weekday_behavior = df_filtered.groupby("weekday").size().reset_index(name="behavior_count")
             weekday_map = {1:"周一/Mon",2:"周二/Tue",3:"周三/Wed",4:"周四/Thu",5:"周五/Fri",6:"周六/Sat",7:"周日/Sun"}
-            weekday_behavior["weekday_name"] = weekday_behavior["weekday"].map(weekday_map)
-            peak_weekday = weekday_behavior.loc[weekday_behavior['behavior_count'].idxmax(), 'weekday_name']
+            weekday_behavior = (
+                behavior_counts["weekday"].rename("behavior_count")
+                .rename(index=weekday_map).rename_axis("weekday_name")
+            )
+            peak_weekday = weekday_behavior.idxmax()
             
             st.subheader("周内活跃分布 / Weekly Activity Distribution")
-            st.bar_chart(weekday_behavior.set_index("weekday_name"))
+            st.bar_chart(weekday_behavior)
             st.info(f"最活跃的星期: {peak_weekday} / Most active weekday: {peak_weekday}")
         
         # 用户分层分析
         st.header("👥 用户分层分析 / User Segmentation Analysis")
         
-        user_behavior_count = df_filtered.groupby("user_id").size().reset_index(name="total_behavior")
-        user_segments = pd.cut(
-            user_behavior_count["total_behavior"],
-            bins=[0, 5, 20, 100, float("inf")],
-            labels=["低活跃(1-5次)", "中活跃(6-20次)", "高活跃(21-100次)", "超高活跃(100+次)"]
-        )
-        segment_dist = user_segments.value_counts()
+        total_users = aggregates["total_users"]
+        segment_dist = aggregates["segment_dist"]
         
         # 显示用户分层统计
         st.subheader("用户活跃度分布 / User Activity Distribution")
         segment_cols = st.columns(4)
         
         for idx, (segment, count) in enumerate(segment_dist.items()):
-            percentage = (count / len(user_behavior_count)) * 100
+            percentage = (count / total_users) * 100
             with segment_cols[idx]:
                 st.metric(segment, f"{count:,}", f"{percentage:.1f}%")
         
         # 热门商品和品类
         st.header("📦 商品与品类分析 / Item and Category Analysis")
         
-        top_items = df_filtered.groupby("item_id").size().nlargest(5).reset_index(name="behavior_count")
-        top_categories = df_filtered.groupby("category_id").size().nlargest(5).reset_index(name="behavior_count")
+        top_items = behavior_counts["top_items"]
+        top_categories = behavior_counts["top_categories"]
         
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("最热门商品 / Most Popular Items")
-            for i, row in top_items.iterrows():
-                st.write(f"{i+1}. 商品ID {row['item_id']}: {row['behavior_count']} 次行为")
+            st.markdown("\n".join(
+                f"{rank}. 商品ID {item_id}: {count} 次行为"
+                for rank, (item_id, count) in enumerate(top_items.items(), start=1)
+            ))
         
         with col2:
             st.subheader("最热门品类 / Most Popular Categories")
-            for i, row in top_categories.iterrows():
-                st.write(f"{i+1}. 品类ID {row['category_id']}: {row['behavior_count']} 次行为")
+            st.markdown("\n".join(
+                f"{rank}. 品类ID {category_id}: {count} 次行为"
+                for rank, (category_id, count) in enumerate(top_categories.items(), start=1)
+            ))
         
         # 核心洞察
         st.header("💡 核心洞察与运营启示 / Key Insights and Operational Implications")
         
         high_active_percentage = (segment_dist.get("高活跃(21-100次)", 0) + 
-                                 segment_dist.get("超高活跃(100+次)", 0)) / len(user_behavior_count) * 100
+                                 segment_dist.get("超高活跃(100+次)", 0)) / total_users * 100
         
         insights = [
             "### 📊 核心洞察 / Key Insights",
@@ -286,8 +464,8 @@ if uploaded_file is not None:
             f"- **Conversion Insight**: View→Purchase conversion rate: {purchase_rate:.2f}%",
             f"- **用户洞察**：{high_active_percentage:.1f}%的高活跃用户贡献主要行为",
             f"- **User Insight**: {high_active_percentage:.1f}% high-active users contribute most behaviors",
-            f"- **商品洞察**：最热门商品ID {top_items.iloc[0]['item_id']} ({top_items.iloc[0]['behavior_count']} 次行为)",
-            f"- **Item Insight**: Most popular item ID {top_items.iloc[0]['item_id']} ({top_items.iloc[0]['behavior_count']} behaviors)",
+            f"- **商品洞察**：最热门商品ID {top_items.index[0]} ({top_items.iloc[0]} 次行为)",
+            f"- **Item Insight**: Most popular item ID {top_items.index[0]} ({top_items.iloc[0]} behaviors)",
             "",
             "### 🎯 运营启示 / Operational Implications",
             f"- 🕒 **优化营销时机**：在{peak_hour}:00-{peak_hour+2}:00高峰时段和{peak_weekday}加强营销活动",
@@ -298,17 +476,14 @@ if uploaded_file is not None:
             f"- 🎯 **Improve Conversion**: Focus on optimizing view→purchase conversion path"
         ]
         
-        for insight in insights:
-            if insight.startswith("###"):
-                st.markdown(insight)
-            elif insight.startswith("- **"):
-                st.markdown(insight)
-            else:
-                st.write(insight)
+        # 一次性渲染全部洞察，避免逐行调用产生多次重绘
+        st.markdown("\n".join(insights))
         
         # 数据样本预览
         with st.expander("📋 数据样本预览 / Data Sample Preview"):
-            st.dataframe(df_filtered.head(100))
+            # date 列为天数，展示时转换为日期
+            preview = aggregates["preview"]
+            st.dataframe(preview.assign(date=pd.to_datetime(preview["date"], unit="D").dt.date))
         
         # 最终内存清理
         gc.collect()
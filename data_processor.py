@@ -3,6 +3,18 @@ import numpy as np
 import argparse
 import os
 import sys
+import gc
+import random
+
+COLUMN_NAMES = ["user_id", "item_id", "category_id", "behavior_type", "timestamp"]
+# 可空整数类型：含空字段的行原样保留，不会因 NA 导致解析失败
+COLUMN_DTYPES = {
+    "user_id": "Int32",
+    "item_id": "Int32",
+    "category_id": "Int32",
+    "behavior_type": "category",
+    "timestamp": "Int32"
+}
 
 def create_sample_data(input_file=None, output_file="UserBehavior_sampled.csv", sample_ratio=0.01):
     """
@@ -13,18 +25,20 @@ def create_sample_data(input_file=None, output_file="UserBehavior_sampled.csv",
         print(f"🔍 正在从 {input_file} 抽样 {sample_ratio*100}% 数据...")
         
         try:
-            # 直接读取抽样
-            df = pd.read_csv(
+            # 快速统计原始行数
+            total_rows = count_lines(input_file)
+            print(f"📊 原始数据行数: {total_rows:,}")
+            
+            # 解析时直接跳过未被抽中的行
+            rng = random.Random(42)
+            sampled_df = pd.read_csv(
                 input_file,
-                names=["user_id", "item_id", "category_id", "behavior_type", "timestamp"],
+                names=COLUMN_NAMES,
                 header=None,
-                low_memory=False
+                dtype=COLUMN_DTYPES,
+                skiprows=lambda i: rng.random() >= sample_ratio,
+                engine="c"
             )
-            
-            print(f"📊 原始数据行数: {len(df):,}")
-            
-            # 抽样
-            sampled_df = df.sample(frac=sample_ratio, random_state=42)
             sampled_df.to_csv(output_file, index=False, header=False)
             
             print(f"✅ 抽样完成！")
@@ -36,36 +50,60 @@ def create_sample_data(input_file=None, output_file="UserBehavior_sampled.csv",
             print("⚠️  内存不足，使用分块读取...")
             process_large_file_in_chunks(input_file, output_file, sample_ratio)
             
+        except ValueError as e:
+            # 非数字的 ID/时间戳字段无法按整型解析
+            print(f"❌ 数据格式错误，请检查输入文件: {e}")
+            
     else:
         # 生成示例数据
         print("🎲 正在生成示例数据...")
         generate_demo_data(output_file)
 
-def process_large_file_in_chunks(input_file, output_file, sample_ratio, chunksize=100000):
-    """分块处理大文件"""
-    chunks = []
+def count_lines(input_file, block_size=1 << 20):
+    """按字节块统计文件行数"""
+    total = 0
+    last_byte = b"\n"
+    with open(input_file, "rb") as fin:
+        while True:
+            block = fin.read(block_size)
+            if not block:
+                break
+            total += block.count(b"\n")
+            last_byte = block[-1:]
+    # 末行无换行符时补计一行
+    if last_byte != b"\n":
+        total += 1
+    return total
+
+def process_large_file_in_chunks(input_file, output_file, sample_ratio, chunksize=100000, gc_every=10):
+    """分块处理大文件（逐块写出，不在内存中累积）"""
     total_rows = 0
+    sampled_rows = 0
+    rng = np.random.default_rng(42)
     
-    for chunk_num, chunk in enumerate(pd.read_csv(
-        input_file,
-        names=["user_id", "item_id", "category_id", "behavior_type", "timestamp"],
-        header=None,
-        chunksize=chunksize,
-        low_memory=False
-    )):
-        sampled_chunk = chunk.sample(frac=sample_ratio, random_state=42)
-        chunks.append(sampled_chunk)
-        total_rows += len(chunk)
-        
-        if chunk_num % 10 == 0:
-            print(f"📦 已处理: {total_rows:,} 行")
-    
-    result = pd.concat(chunks, ignore_index=True)
-    result.to_csv(output_file, index=False, header=False)
+    with open(output_file, "w", newline="") as fout:
+        for chunk_num, chunk in enumerate(pd.read_csv(
+            input_file,
+            names=COLUMN_NAMES,
+            header=None,
+            dtype=COLUMN_DTYPES,
+            chunksize=chunksize,
+            low_memory=False
+        )):
+            # 伯努利抽样：共用一个随机数生成器，避免每块抽中相同位置
+            sampled_chunk = chunk.loc[rng.random(len(chunk)) < sample_ratio]
+            sampled_chunk.to_csv(fout, index=False, header=False)
+            total_rows += len(chunk)
+            sampled_rows += len(sampled_chunk)
+            del chunk, sampled_chunk
+            
+            if chunk_num % gc_every == 0:
+                gc.collect()
+                print(f"📦 已处理: {total_rows:,} 行")
     
     print(f"✅ 处理完成！")
     print(f"📁 输出文件: {output_file}")
-    print(f"📈 总行数: {len(result):,}")
+    print(f"📈 总行数: {sampled_rows:,}")
 
 def generate_demo_data(output_file, n_samples=50000):
     """生成演示数据"""